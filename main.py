@@ -1,9 +1,15 @@
+import atexit
+import csv
 import logging
+import logging.handlers
+import operator
 import os
-import pandas as pd
+import queue
+import sys
+import threading
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List
 from dotenv import load_dotenv  # Importing dotenv to read environment variables
 
 # ============================================================================== #
@@ -16,21 +22,63 @@ load_dotenv()
 # Read the history file path from the environment variable
 history_file = os.getenv("HISTORY_FILE", "calculator_history.csv")  # Default to 'calculator_history.csv' if not set
 
+# Column layout of the history CSV
+HISTORY_COLUMNS = ["Operation", "Operand1", "Operand2", "Result"]
+
+# Maximum number of history rows waiting for the background writer
+HISTORY_QUEUE_SIZE = 4096
+
+# Sentinels telling the background writer to flush or to stop
+_WRITER_FLUSH = object()
+_WRITER_STOP = object()
+
+# Read the log level from the environment; CALC_DEBUG=1 enables the per-operation DEBUG records
+log_level_name = "DEBUG" if os.getenv("CALC_DEBUG") == "1" else os.getenv("LOG_LEVEL", "INFO").upper()
+log_level = logging.getLevelName(log_level_name)
+if not isinstance(log_level, int):  # Unknown level names fall back to INFO
+    log_level = logging.INFO
+
+# Buffer records in memory and write them to the log file in batches (errors flush immediately)
+file_handler = logging.FileHandler('calculator.log')  # Log to a file
+file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))  # Log format
+memory_handler = logging.handlers.MemoryHandler(capacity=512, target=file_handler)
+
 logging.basicConfig(
-    filename='calculator.log',  # Log to a file
-    level=logging.DEBUG,        # Capture all levels of logging (DEBUG and above)
-    format='%(asctime)s - %(levelname)s - %(message)s'  # Log format
+    level=log_level,
+    handlers=[memory_handler]
 )
 
+# Number of history rows written between flushes of the CSV file (read after logging is set up so a bad value can be logged)
+try:
+    history_flush_every = max(1, int(os.getenv("HISTORY_FLUSH_EVERY", "32")))
+except ValueError:
+    logging.warning("Invalid HISTORY_FLUSH_EVERY %r, using 32", os.getenv("HISTORY_FLUSH_EVERY"))
+    history_flush_every = 32
+
 # ============================================================================== #
 # CLASSES AND CALCULATOR OPERATIONS
 # ============================================================================== #
 
+def _is_number(value) -> bool:
+    """Returns True for int/float values (including subclasses such as numpy.float64), but not bool."""
+    # Exact type checks cover the common case without the isinstance() MRO walk
+    if value.__class__ is float or value.__class__ is int:
+        return True
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
 class TemplateOperation(ABC):
     """
     Abstract base class representing a mathematical operation using the Template Method pattern.
     """
 
+    __slots__ = ()
+
+    # Lowercase name shown in history listings
+    name: str
+    # Name stored in the history CSV's Operation column (the original class-name spelling)
+    history_name: str
+
     def calculate(self, a: float, b: float) -> float:
         self.validate_inputs(a, b)
         result = self.execute(a, b)
@@ -41,8 +89,8 @@ class TemplateOperation(ABC):
         """
         Validates inputs to ensure they are numbers.
         """
-        if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
-            logging.error(f"Invalid input: {a}, {b} (Inputs must be numbers)")
+        if not _is_number(a) or not _is_number(b):
+            logging.error("Invalid input: %s, %s (Inputs must be numbers)", a, b)
             raise ValueError("Both inputs must be numbers.")
 
     @abstractmethod
@@ -53,45 +101,70 @@ class TemplateOperation(ABC):
         """
         Logs the result of the operation.
         """
-        logging.info(f"Operation performed: {a} and {b} -> Result: {result}")
+        logging.info("Operation performed: %s and %s -> Result: %s", a, b, result)
 
 
 class Addition(TemplateOperation):
-    def execute(self, a: float, b: float) -> float:
-        return a + b
+    __slots__ = ()
+    name = "addition"
+    history_name = "Addition"
+
+    execute = staticmethod(operator.add)
 
 
 class Subtraction(TemplateOperation):
-    def execute(self, a: float, b: float) -> float:
-        return a - b
+    __slots__ = ()
+    name = "subtraction"
+    history_name = "Subtraction"
+
+    execute = staticmethod(operator.sub)
 
 
 class Multiplication(TemplateOperation):
-    def execute(self, a: float, b: float) -> float:
-        return a * b
+    __slots__ = ()
+    name = "multiplication"
+    history_name = "Multiplication"
+
+    execute = staticmethod(operator.mul)
+
+
+def _safe_div(a: float, b: float) -> float:
+    """Division with the zero check inlined, used directly as Division.execute."""
+    if b == 0:
+        logging.error("Attempted to divide by zero.")
+        raise ValueError("Division by zero is not allowed.")
+    return a / b
 
 
 class Division(TemplateOperation):
-    def execute(self, a: float, b: float) -> float:
-        if b == 0:
-            logging.error("Attempted to divide by zero.")
-            raise ValueError("Division by zero is not allowed.")
-        return a / b
+    __slots__ = ()
+    name = "division"
+    history_name = "Division"
+
+    execute = staticmethod(_safe_div)
+
+
+# Operations are stateless, so the factory hands out these shared instances
+_OPERATIONS: Dict[str, TemplateOperation] = {
+    "add": Addition(),
+    "subtract": Subtraction(),
+    "multiply": Multiplication(),
+    "divide": Division(),
+}
+
+# The same instances keyed by their lowercase name, for reading the history CSV case-insensitively
+_OPERATIONS_BY_NAME: Dict[str, TemplateOperation] = {op.name: op for op in _OPERATIONS.values()}
 
 
 class OperationFactory:
+    __slots__ = ()
+
     @staticmethod
     def create_operation(operation: str) -> TemplateOperation:
-        operations_map = {
-            "add": Addition(),
-            "subtract": Subtraction(),
-            "multiply": Multiplication(),
-            "divide": Division(),
-        }
-        logging.debug(f"Creating operation for: {operation}")
-        operation_obj = operations_map.get(operation.lower())
+        logging.debug("Creating operation for: %s", operation)
+        operation_obj = _OPERATIONS.get(operation.lower())
         if not operation_obj:
-            logging.error(f"Unknown operation: {operation}")
+            logging.error("Unknown operation: %s", operation)
         return operation_obj
 
 
@@ -100,22 +173,30 @@ class HistoryObserver:
     Observer that gets notified whenever a new calculation is added to history.
     """
 
+    __slots__ = ()
+
     def update(self, calculation):
-        logging.info(f"Observer: New calculation added -> {calculation}")
+        logging.info("Observer: New calculation added -> %s", calculation)
 
 
 @dataclass
 class Calculation:
+    # Declared by hand rather than slots=True so the class still works on Python 3.8
+    __slots__ = ("operation", "operand1", "operand2", "result")
+
     operation: TemplateOperation
     operand1: float
     operand2: float
 
+    def __post_init__(self):
+        # Compute once into the "result" slot; listing and saving history read the cached value
+        self.result = self.operation.execute(self.operand1, self.operand2)
+
     def __repr__(self) -> str:
-        return f"Calculation({self.operand1}, {self.operation.__class__.__name__.lower()}, {self.operand2})"
+        return f"Calculation({self.operand1}, {self.operation.name}, {self.operand2})"
 
     def __str__(self) -> str:
-        result = self.operation.calculate(self.operand1, self.operand2)
-        return f"{self.operand1} {self.operation.__class__.__name__.lower()} {self.operand2} = {result}"
+        return f"{self.operand1} {self.operation.name} {self.operand2} = {self.result}"
 
 
 class CalculatorWithObserver:
@@ -127,54 +208,173 @@ class CalculatorWithObserver:
         self.history_file = history_file
         self._history: List[Calculation] = self.load_history()
         self._observers: List[HistoryObserver] = []
+        self._dropped_rows = 0
+        self._write_q = queue.Queue(maxsize=HISTORY_QUEUE_SIZE)
+        self._flush_every = history_flush_every
+        self._writer = None  # Started on the first appended row
 
     def add_observer(self, observer: HistoryObserver):
         self._observers.append(observer)
-        logging.debug(f"Observer added: {observer}")
+        logging.debug("Observer added: %s", observer)
 
     def notify_observers(self, calculation):
         for observer in self._observers:
             observer.update(calculation)
-            logging.debug(f"Notified observer about: {calculation}")
+        logging.debug("Notified %d observer(s) about: %s", len(self._observers), calculation)
 
     def perform_operation(self, operation: TemplateOperation, a: float, b: float):
         calculation = Calculation(operation, a, b)
         self._history.append(calculation)
         self.notify_observers(calculation)
-        logging.debug(f"Performed operation: {calculation}")
-        self.save_history()
-        return operation.calculate(a, b)
+        logging.debug("Performed operation: %s", calculation)
+        self.append_history(calculation)
+        return calculation.result
+
+    def append_history(self, calculation):
+        """
+        Queue a single calculation row for the background writer instead of rewriting the whole history.
+        """
+        row = (calculation.operation.history_name, calculation.operand1, calculation.operand2, calculation.result)
+        if self._writer is None:
+            self._start_writer()
+        try:
+            self._write_q.put_nowait(row)
+        except queue.Full:
+            self._dropped_rows += 1
+            logging.error("History write queue full, dropped %d row(s)", self._dropped_rows)
+
+    def _start_writer(self):
+        """
+        Start the background writer; it runs until close() is called.
+        """
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+        atexit.register(self.close)  # Write out buffered rows on a clean shutdown
+
+    def _writer_loop(self):
+        """
+        Drain queued rows into the CSV file, opened once in append mode and flushed every few rows.
+        """
+        csv_file = writer = None
+        unflushed = 0
+        try:
+            while True:
+                row = self._write_q.get()
+                try:
+                    if row is _WRITER_STOP:
+                        break
+                    if row is _WRITER_FLUSH:
+                        if csv_file is not None:
+                            csv_file.flush()
+                        unflushed = 0
+                        continue
+                    if writer is None:
+                        csv_file, writer = self._open_history_for_append()
+                    writer.writerow(row)
+                    unflushed += 1
+                    if unflushed >= self._flush_every:
+                        csv_file.flush()
+                        unflushed = 0
+                except Exception as e:
+                    logging.error("Error appending to history: %s", e)
+                finally:
+                    self._write_q.task_done()
+        finally:
+            if csv_file is not None:
+                csv_file.close()
+
+    def _open_history_for_append(self):
+        """
+        Open the CSV file in append mode, writing the header if the file is empty.
+        Returns the file and its csv.writer together, or raises with the file closed.
+        """
+        csv_file = open(self.history_file, "a", newline="")
+        try:
+            writer = csv.writer(csv_file)
+            if os.path.getsize(self.history_file) == 0:
+                writer.writerow(HISTORY_COLUMNS)
+        except Exception:
+            csv_file.close()
+            raise
+        return csv_file, writer
+
+    def flush_history(self):
+        """
+        Block until every queued row has been written and flushed to the CSV file.
+        """
+        if self._writer is not None:
+            self._write_q.put(_WRITER_FLUSH)
+            self._write_q.join()
+
+    def close(self):
+        """
+        Drain the write queue and stop the background writer, if one is running.
+        """
+        if self._writer is not None:
+            self._write_q.put(_WRITER_STOP)
+            self._writer.join()
+            self._writer = None
+            atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def save_history(self):
+        """
+        Rewrite the CSV file from the in-memory history. Returns True on success, False on failure.
+        """
+        self.flush_history()
         try:
-            history_data = [
-                {"Operation": str(calc.operation.__class__.__name__), "Operand1": calc.operand1, "Operand2": calc.operand2, "Result": calc.operation.calculate(calc.operand1, calc.operand2)}
-                for calc in self._history
-            ]
-            df = pd.DataFrame(history_data)
+            import pandas as pd  # Imported here so startup does not pay for pandas
+
+            # Build one list per column so pandas gets contiguous columns instead of per-row dicts
+            operations, operands1, operands2, results = [], [], [], []
+            for calc in self._history:
+                operations.append(calc.operation.history_name)
+                operands1.append(calc.operand1)
+                operands2.append(calc.operand2)
+                results.append(calc.result)
+            df = pd.DataFrame(
+                {"Operation": operations, "Operand1": operands1, "Operand2": operands2, "Result": results},
+                columns=HISTORY_COLUMNS,
+            )
             df.to_csv(self.history_file, index=False)
-            logging.info(f"History saved to {self.history_file}")
+            logging.info("History saved to %s", self.history_file)
+            return True
         except Exception as e:
-            logging.error(f"Error saving history: {e}")
+            logging.error("Error saving history: %s", e)
+            return False
 
     def load_history(self):
         try:
             if os.path.exists(self.history_file):
-                df = pd.read_csv(self.history_file)
-                if 'Operation' not in df.columns or 'Operand1' not in df.columns or 'Operand2' not in df.columns:
-                    logging.error("CSV file missing required columns")
-                    return []
-                history = [
-                    Calculation(OperationFactory.create_operation(row["Operation"].lower()), row["Operand1"], row["Operand2"])
-                    for index, row in df.iterrows()
-                ]
-                logging.info(f"Loaded history from {self.history_file}")
+                with open(self.history_file, newline="") as csv_file:
+                    reader = csv.DictReader(csv_file)
+                    columns = reader.fieldnames or []
+                    if 'Operation' not in columns or 'Operand1' not in columns or 'Operand2' not in columns:
+                        logging.error("CSV file missing required columns")
+                        return []
+                    # Check rows one by one so a bad row cannot discard the valid ones
+                    history = []
+                    for row in reader:
+                        operation = _OPERATIONS_BY_NAME.get((row["Operation"] or "").lower())
+                        if operation is None:
+                            logging.error("Skipping unknown operation in history: %s", row["Operation"])
+                            continue
+                        try:
+                            history.append(Calculation(operation, float(row["Operand1"]), float(row["Operand2"])))
+                        except (TypeError, ValueError) as e:
+                            logging.error("Skipping invalid history row %s: %s", row, e)
+                logging.info("Loaded history from %s", self.history_file)
                 return history
             else:
                 logging.info("No history file found. Starting fresh.")
                 return []
         except Exception as e:
-            logging.error(f"Error loading history: {e}")
+            logging.error("Error loading history: %s", e)
             return []
 
     def get_history(self):
@@ -184,21 +384,82 @@ class CalculatorWithObserver:
         """
         Manually load history from the CSV file.
         """
-        logging.info(f"Loading history manually from {self.history_file}...")
+        logging.info("Loading history manually from %s...", self.history_file)
+        self.flush_history()
         return self.load_history()
 
     def save_history_manually(self):
         """
         Manually save the current history to the CSV file.
         """
-        logging.info(f"Saving history manually to {self.history_file}...")
-        self.save_history()
+        logging.info("Saving history manually to %s...", self.history_file)
+        return self.save_history()
 
 
 # ============================================================================== #
 # REPL INTERFACE
 # ============================================================================== #
 
+def _cmd_help(calc):
+    print("\nAvailable commands:")
+    print("  add <num1> <num2>       : Add two numbers.")
+    print("  subtract <num1> <num2>  : Subtract the second number from the first.")
+    print("  multiply <num1> <num2>  : Multiply two numbers.")
+    print("  divide <num1> <num2>    : Divide the first number by the second.")
+    print("  list                    : Show the calculation history.")
+    print("  clear                   : Clear the calculation history.")
+    print("  save_history            : Save the history manually.")
+    print("  load_history            : Load the history manually.")
+    print("  exit                    : Exit the calculator.\n")
+
+
+def _cmd_exit(calc):
+    calc.close()
+    print("Exiting calculator...")
+    return True  # Stop the REPL
+
+
+def _cmd_list(calc):
+    history = calc.get_history()
+    if not history:
+        print("No calculations in history.")
+    else:
+        # One write for the whole listing; each line reads the cached result
+        sys.stdout.write("\n".join(map(str, history)) + "\n")
+
+
+def _cmd_clear(calc):
+    calc._history.clear()
+    if not calc.save_history():
+        print(f"History cleared in memory, but {calc.history_file} could not be updated. See calculator.log.")
+        return
+    logging.info("History cleared.")
+    print("History cleared.")
+
+
+def _cmd_save_history(calc):
+    if calc.save_history_manually():
+        print(f"History manually saved to {calc.history_file}")
+    else:
+        print(f"Could not save history to {calc.history_file}. See calculator.log.")
+
+
+def _cmd_load_history(calc):
+    calc.load_history_manually()
+    print(f"History manually loaded from {calc.history_file}")
+
+
+# REPL commands, keyed by their lowercase name; a handler returns True to exit
+_COMMANDS = {
+    "help": _cmd_help,
+    "exit": _cmd_exit,
+    "list": _cmd_list,
+    "clear": _cmd_clear,
+    "save_history": _cmd_save_history,
+    "load_history": _cmd_load_history,
+}
+
+
 def calculator():
     calc = CalculatorWithObserver()
 
@@ -210,51 +471,18 @@ def calculator():
     while True:
         user_input = input("Enter an operation and two numbers, or a command: ")
 
-        if user_input.lower() == "help":
-            print("\nAvailable commands:")
-            print("  add <num1> <num2>       : Add two numbers.")
-            print("  subtract <num1> <num2>  : Subtract the second number from the first.")
-            print("  multiply <num1> <num2>  : Multiply two numbers.")
-            print("  divide <num1> <num2>    : Divide the first number by the second.")
-            print("  list                    : Show the calculation history.")
-            print("  clear                   : Clear the calculation history.")
-            print("  save_history            : Save the history manually.")
-            print("  load_history            : Load the history manually.")
-            print("  exit                    : Exit the calculator.\n")
-            continue
-
-        if user_input.lower() == "exit":
-            print("Exiting calculator...")
-            break
-
-        if user_input.lower() == "list":
-            if not calc.get_history():
-                print("No calculations in history.")
-            else:
-                for calc_item in calc.get_history():
-                    print(calc_item)
-            continue
-
-        if user_input.lower() == "clear":
-            calc._history.clear()
-            calc.save_history()
-            logging.info("History cleared.")
-            print("History cleared.")
-            continue
-
-        if user_input.lower() == "save_history":
-            calc.save_history_manually()
-            print(f"History manually saved to {calc.history_file}")
-            continue
-
-        if user_input.lower() == "load_history":
-            calc.load_history_manually()
-            print(f"History manually loaded from {calc.history_file}")
-            continue
+        # Split once; commands are single words, operations are "<operation> <num1> <num2>"
+        parts = user_input.split(maxsplit=2)
+
+        if len(parts) == 1:
+            handler = _COMMANDS.get(parts[0]) or _COMMANDS.get(parts[0].lower())
+            if handler:
+                if handler(calc):
+                    break
+                continue
 
         try:
-            # Splitting input, making sure we handle spaces
-            operation_str, num1_str, num2_str = user_input.split()
+            operation_str, num1_str, num2_str = parts
 
             # Convert numbers to float
             num1, num2 = float(num1_str), float(num2_str)
@@ -271,11 +499,11 @@ def calculator():
 
         except ValueError as e:
             # Handle invalid inputs gracefully
-            logging.error(f"Invalid input or error: {e}")
+            logging.error("Invalid input or error: %s", e)
             print("Invalid input. Please enter a valid operation and two numbers. Type 'help' for instructions.")
         except Exception as e:
             # Handle any other errors
-            logging.error(f"Unexpected error: {e}")
+            logging.error("Unexpected error: %s", e)
             print("An unexpected error occurred.")
 
 
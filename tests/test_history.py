@@ -0,0 +1,146 @@
+""" tests/test_history.py """
+import csv
+import queue
+
+import pytest
+
+from main import CalculatorWithObserver, OperationFactory, _cmd_clear
+
+
+def read_rows(path):
+    """Returns the CSV file as a list of rows, header included."""
+    with open(path, newline="") as csv_file:
+        return list(csv.reader(csv_file))
+
+
+@pytest.fixture
+def history_path(tmp_path):
+    """Path of a history CSV file that does not exist yet."""
+    return tmp_path / "history.csv"
+
+
+@pytest.fixture
+def calc(history_path):
+    """Calculator writing to the temporary history file, closed after the test."""
+    calculator = CalculatorWithObserver(history_file=str(history_path))
+    yield calculator
+    calculator.close()
+
+
+def test_rows_written_after_flush(calc, history_path):
+    """Test appended rows are on disk after flush_history()."""
+    calc.perform_operation(OperationFactory.create_operation("add"), 1.0, 2.0)
+    calc.flush_history()
+    assert read_rows(history_path)[1:] == [["Addition", "1.0", "2.0", "3.0"]]
+
+
+def test_rows_written_after_close(calc, history_path):
+    """Test appended rows are on disk after close()."""
+    calc.perform_operation(OperationFactory.create_operation("multiply"), 2.0, 3.0)
+    calc.perform_operation(OperationFactory.create_operation("subtract"), 5.0, 1.0)
+    calc.close()
+    assert read_rows(history_path)[1:] == [
+        ["Multiplication", "2.0", "3.0", "6.0"],
+        ["Subtraction", "5.0", "1.0", "4.0"],
+    ]
+
+
+@pytest.mark.parametrize("create_empty", [False, True])
+def test_header_written_once(history_path, create_empty):
+    """Test a new or empty history file gets exactly one header row."""
+    if create_empty:
+        history_path.touch()
+    with CalculatorWithObserver(history_file=str(history_path)) as calc:
+        calc.perform_operation(OperationFactory.create_operation("add"), 1.0, 1.0)
+        calc.perform_operation(OperationFactory.create_operation("add"), 2.0, 2.0)
+    with CalculatorWithObserver(history_file=str(history_path)) as calc:
+        calc.perform_operation(OperationFactory.create_operation("add"), 3.0, 3.0)
+    rows = read_rows(history_path)
+    assert rows[0] == ["Operation", "Operand1", "Operand2", "Result"]
+    assert [row[0] for row in rows].count("Operation") == 1
+    assert len(rows) == 4
+
+
+def test_clear_then_append(calc, history_path, capsys):
+    """Test clearing the history and appending again leaves a valid CSV."""
+    calc.perform_operation(OperationFactory.create_operation("add"), 1.0, 2.0)
+    _cmd_clear(calc)
+    assert "History cleared." in capsys.readouterr().out
+    calc.perform_operation(OperationFactory.create_operation("divide"), 8.0, 2.0)
+    calc.close()
+    with open(history_path, newline="") as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    assert rows == [{"Operation": "Division", "Operand1": "8.0", "Operand2": "2.0", "Result": "4.0"}]
+
+
+def test_full_queue_drops_rows(calc, monkeypatch):
+    """Test a full write queue drops the row and counts it."""
+    monkeypatch.setattr(calc, "_start_writer", lambda: None)  # Nothing drains the queue
+    calc._write_q = queue.Queue(maxsize=1)
+    operation = OperationFactory.create_operation("add")
+    calc.perform_operation(operation, 1.0, 1.0)
+    calc.perform_operation(operation, 2.0, 2.0)
+    calc.perform_operation(operation, 3.0, 3.0)
+    assert calc._dropped_rows == 2
+    assert len(calc.get_history()) == 3
+
+
+def test_writer_restarts_after_close(calc, history_path):
+    """Test a closed calculator starts a new writer when it appends again."""
+    calc.perform_operation(OperationFactory.create_operation("add"), 1.0, 2.0)
+    calc.close()
+    assert calc._writer is None
+    calc.perform_operation(OperationFactory.create_operation("add"), 3.0, 4.0)
+    assert calc._writer is not None and calc._writer.is_alive()
+    calc.close()
+    assert [row[1:3] for row in read_rows(history_path)[1:]] == [["1.0", "2.0"], ["3.0", "4.0"]]
+
+
+def write_history(path, text):
+    """Writes raw CSV text to the history file."""
+    with open(path, "w", newline="") as csv_file:
+        csv_file.write(text)
+
+
+def test_save_then_reload(calc, history_path):
+    """Test a saved history loads back unchanged."""
+    for name, a, b in [("add", 1.0, 2.0), ("subtract", 5.0, 3.0), ("multiply", 2.0, 4.0), ("divide", 9.0, 3.0)]:
+        calc.perform_operation(OperationFactory.create_operation(name), a, b)
+    assert calc.save_history()
+    calc.close()
+    with CalculatorWithObserver(history_file=str(history_path)) as reloaded:
+        assert reloaded.get_history() == calc.get_history()
+
+
+def test_load_old_format(history_path):
+    """Test a history file storing class names such as 'Addition' still loads."""
+    write_history(history_path, "Operation,Operand1,Operand2,Result\nAddition,2.0,2.0,4.0\nDivision,9.0,3.0,3.0\n")
+    with CalculatorWithObserver(history_file=str(history_path)) as calc:
+        assert [str(item) for item in calc.get_history()] == ["2.0 addition 2.0 = 4.0", "9.0 division 3.0 = 3.0"]
+
+
+def test_load_skips_bad_rows(history_path):
+    """Test invalid rows are skipped while the valid ones still load."""
+    write_history(
+        history_path,
+        "Operation,Operand1,Operand2,Result\n"
+        "addition,1.0,2.0,3.0\n"
+        "power,2.0,3.0,8.0\n"
+        "subtraction,x,1.0,\n"
+        "multiplication,5.0\n"
+        "division,1.0,0.0,\n"
+        "multiplication,2.0,3.0,6.0\n",
+    )
+    with CalculatorWithObserver(history_file=str(history_path)) as calc:
+        assert [str(item) for item in calc.get_history()] == ["1.0 addition 2.0 = 3.0", "2.0 multiplication 3.0 = 6.0"]
+
+
+def test_operation_column_keeps_class_names(history_path):
+    """Test appended and saved rows use the same 'Addition' spelling as existing history files."""
+    write_history(history_path, "Operation,Operand1,Operand2,Result\nAddition,2.0,2.0,4.0\n")
+    with CalculatorWithObserver(history_file=str(history_path)) as calc:
+        calc.perform_operation(OperationFactory.create_operation("subtract"), 3.0, 1.0)
+        calc.flush_history()
+        assert [row[0] for row in read_rows(history_path)] == ["Operation", "Addition", "Subtraction"]
+        assert calc.save_history()
+        assert [row[0] for row in read_rows(history_path)] == ["Operation", "Addition", "Subtraction"]